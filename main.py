@@ -3,7 +3,8 @@ import time
 import requests
 from dotenv import load_dotenv
 from services.supabase_service import SupabaseService
-from utils.helpers import APIHelper
+from services.image_service import ImageService
+from utils.helpers import APIHelper, normalizar_uuid
 import warnings
 from psycopg2 import OperationalError
 
@@ -12,10 +13,25 @@ load_dotenv()
 warnings.filterwarnings('ignore', message='invalid configuration parameter name "supautils.disable_program"')
 
 class ParlamentariosBot:
+    # Fracción máxima de registros fallidos o inválidos con la que todavía se poda
+    MAX_FALLOS_PODA = 0.2
+
     def __init__(self):
         self.supabase_service = SupabaseService()
         self.api_helper = APIHelper()
+        self.image_service = ImageService()
     
+    def sincronizar_imagenes(self, procesados):
+        """Sube las imágenes a Storage y registra sus claves; nunca interrumpe el bot"""
+        try:
+            manifest = self.supabase_service.get_imagenes_cache()
+            imagenes, cambios = self.image_service.sync_images(procesados, manifest)
+            self.supabase_service.guardar_imagenes_cache(cambios)
+            return self.supabase_service.update_imagenes_locales(imagenes)
+        except Exception as e:
+            print(f"❌ Error en la sincronización de imágenes: {e}")
+            return 0
+
     def run(self):
         """Ejecuta el flujo principal del bot"""
         print("🤖 Iniciando bot de parlamentarios...")
@@ -41,21 +57,26 @@ class ParlamentariosBot:
             existentes = 0
             errores = 0
             uuid_invalidos = 0
+            saltados = 0
+            procesados = []
             
             for data in parlamentarios_data:
                 # Procesar datos y saltar si son inválidos
                 processed_data = self.api_helper.process_parlamentario_data(data)
                 if not processed_data:
                     print(f"⚠️ Saltando datos inválidos: {data.get('NOMBRE', 'Sin nombre')}")
+                    saltados += 1
                     continue
                     
                 # Procesar parlamentario
-                if self.supabase_service.check_parlamentario_exists(processed_data['UUID']):
+                if normalizar_uuid(processed_data['UUID']) in existing_uuids:
                     existentes += 1
                 else:
                     nuevos += 1
                     
-                if not self.supabase_service.insert_parlamentario(processed_data):
+                if self.supabase_service.insert_parlamentario(processed_data):
+                    procesados.append(processed_data)
+                else:
                     errores += 1
                 
                 # Contar UUIDs inválidos en comités (maneja tanto strings como dicts)
@@ -70,12 +91,28 @@ class ParlamentariosBot:
                     
                 time.sleep(0.1)
 
+            # Podar comités y períodos que ya no vienen en la API. Solo se reconcilian los
+            # parlamentarios sincronizados; si fallaron demasiados se sospecha del payload
+            podados = {'comites_eliminados': 0, 'periodos_cerrados': 0}
+            fallidos = errores + saltados
+            if parlamentarios_data and fallidos <= len(parlamentarios_data) * self.MAX_FALLOS_PODA:
+                podados = self.supabase_service.reconciliar_membresias(procesados)
+            else:
+                print(f"⚠️ {fallidos} de {len(parlamentarios_data)} registros fallaron, se omite la reconciliación de membresías")
+
+            # Espejar imágenes de perfil en Supabase Storage
+            actualizadas = self.sincronizar_imagenes(procesados)
+
             print("\n" + "="*50)
             print(f"📊 RESUMEN FINAL - PARLAMENTARIOS")
             print("="*50)
             print(f"✅ Nuevos insertados: {nuevos}")
             print(f"🔄 Actualizados: {existentes}")
             print(f"⚠️ Con UUID inválidos: {uuid_invalidos}")
+            print(f"🖼️ Imágenes actualizadas: {actualizadas}")
+            print(f"🧹 Vínculos de comité eliminados: {podados['comites_eliminados']}")
+            print(f"🧹 Períodos cerrados: {podados['periodos_cerrados']}")
+            print(f"⏭️ Datos inválidos saltados: {saltados}")
             print(f"❌ Errores: {errores}")
             print(f"📈 Total procesados: {len(parlamentarios_data)}")
             print("="*50 + "\n")
@@ -1,4 +1,5 @@
 import os
+import uuid
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
@@ -57,12 +58,10 @@ class Database:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute(query, params or ())
             if fetch_all:
-                result = cursor.fetchall()
-                # Convertir cada fila a dict si es necesario
-                return [dict(row) if not isinstance(row, dict) else row for row in result]
+                # RealDictRow ya es un dict, no hace falta reconstruir cada fila
+                return cursor.fetchall()
             else:
-                result = cursor.fetchone()
-                return dict(result) if result and not isinstance(result, dict) else result
+                return cursor.fetchone()
         except Exception as e:
             print(f"❌ Error al ejecutar consulta: {e}")
             conn.rollback()
@@ -72,6 +71,36 @@ class Database:
                 cursor.close()
             conn.commit()
     
+    def iter_query(self, query, params=None, itersize=2000, as_tuples=False):
+        """Itera los resultados de una consulta usando un cursor del lado del servidor
+
+        Las filas se traen en lotes de ``itersize`` para que la memoria no
+        crezca con el tamaño de la tabla. Con ``as_tuples=True`` cada fila se
+        entrega como tupla en lugar de dict. El cursor usa una conexión propia,
+        así que se puede escribir con la conexión compartida mientras se itera.
+        """
+        conn = self._create_connection()
+        cursor = None
+        try:
+            # Un cursor con nombre se ejecuta en el servidor (DECLARE ... CURSOR)
+            name = f"iter_{uuid.uuid4().hex}"
+            if as_tuples:
+                cursor = conn.cursor(name=name)
+            else:
+                cursor = conn.cursor(name=name, cursor_factory=RealDictCursor)
+            cursor.itersize = itersize
+            cursor.execute(query, params or ())
+            for row in cursor:
+                yield row
+        except Exception as e:
+            print(f"❌ Error al iterar consulta: {e}")
+            raise
+        finally:
+            if cursor and not cursor.closed:
+                cursor.close()
+            # Cerrar la conexión dedicada descarta la transacción de solo lectura
+            conn.close()
+
     def insert_parlamentario(self, data):
         """Inserta parlamentario con validación de slug"""
         if not data.get('slug'):
@@ -0,0 +1,184 @@
+import os
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+from dotenv import load_dotenv
+from supabase import create_client
+
+load_dotenv()
+
+# Campos de imagen del payload y la columna donde se guarda la clave en Storage
+IMAGE_FIELDS = {
+    'IMAGEN': 'imagen_local',
+    'IMAGEN_120': 'imagen_120_local',
+    'IMAGEN_450': 'imagen_450_local',
+    'IMAGEN_600': 'imagen_600_local',
+}
+
+# Firmas de los formatos que publica senado.cl: (prefijo, extensión, content-type)
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', '.jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', '.png', 'image/png'),
+    (b'GIF87a', '.gif', 'image/gif'),
+    (b'GIF89a', '.gif', 'image/gif'),
+]
+
+class ImageService:
+    """Espeja las imágenes de perfil en Supabase Storage
+
+    Requiere SUPABASE_URL, SUPABASE_KEY (service role) y un bucket existente
+    (SUPABASE_IMAGES_BUCKET, por defecto 'parlamentarios'). Ver config/.env.example.
+    """
+
+    def __init__(self):
+        self.bucket_name = os.getenv('SUPABASE_IMAGES_BUCKET', 'parlamentarios')
+        self.max_workers = int(os.getenv('IMAGES_MAX_WORKERS', '8'))
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        self._client = None
+        # Claves confirmadas en el bucket durante esta ejecución y un lock por clave
+        self._claves_subidas = set()
+        self._locks = {}
+        self._lock = threading.Lock()
+        # Una sesión HTTP por hilo para reutilizar conexiones con senado.cl
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        """Devuelve la sesión HTTP del hilo actual"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _bucket(self):
+        """Devuelve el bucket de Storage del cliente ya configurado"""
+        return self._client.storage.from_(self.bucket_name)
+
+    def _configurar_storage(self) -> bool:
+        """Valida la configuración de Storage una sola vez por ejecución"""
+        url = os.getenv('SUPABASE_URL')
+        key = os.getenv('SUPABASE_KEY')
+        if not url or not key:
+            print("⚠️ SUPABASE_URL/SUPABASE_KEY no configurados, se omite la sincronización de imágenes")
+            return False
+        try:
+            self._client = create_client(url, key)
+            self._client.storage.get_bucket(self.bucket_name)
+            return True
+        except Exception as e:
+            print(f"⚠️ Bucket '{self.bucket_name}' no disponible, se omite la sincronización de imágenes: {e}")
+            return False
+
+    @staticmethod
+    def _sniff_type(content: bytes):
+        """Deduce extensión y content-type a partir de los bytes, no de las cabeceras"""
+        if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+            return '.webp', 'image/webp'
+        for signature, ext, content_type in IMAGE_SIGNATURES:
+            if content.startswith(signature):
+                return ext, content_type
+        return '', 'application/octet-stream'
+
+    def _clave(self, content: bytes):
+        """Calcula la clave direccionada por contenido y su content-type"""
+        digest = hashlib.sha256(content).hexdigest()
+        ext, content_type = self._sniff_type(content)
+        return f"{digest[:2]}/{digest}{ext}", content_type
+
+    def _upload(self, key: str, content: bytes, content_type: str):
+        """Sube el contenido al bucket bajo su clave si todavía no está"""
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # Contenido idéntico bajo otra URL espera a la primera subida en vez de repetirla
+        with key_lock:
+            if key not in self._claves_subidas:
+                bucket = self._bucket()
+                if not bucket.exists(key):
+                    bucket.upload(key, content, file_options={
+                        'content-type': content_type,
+                        'cache-control': '31536000',
+                        'upsert': 'false'
+                    })
+                self._claves_subidas.add(key)
+
+    def _fetch(self, url: str, cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Descarga una imagen con petición condicional; devuelve la entrada del manifiesto"""
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response = self._session().get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                return cached
+            response.raise_for_status()
+            key, content_type = self._clave(response.content)
+            # Mismos bytes que la versión ya espejada: no hace falta tocar Storage
+            if not cached or cached.get('key') != key:
+                self._upload(key, response.content, content_type)
+            return {
+                'key': key,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        except Exception as e:
+            print(f"❌ Error sincronizando imagen {url}: {e}")
+            # Si falla la descarga o la subida conservar la última versión conocida
+            return cached
+
+    def sync_images(self, parlamentarios_data: List[Dict[str, Any]], manifest: Dict[str, Dict[str, Any]]):
+        """Sincroniza concurrentemente las imágenes con Storage
+
+        ``manifest`` es el estado guardado de ejecuciones anteriores
+        (URL -> {key, etag, last_modified}). Devuelve
+        ``({uuid: {columna_local: clave}}, {url: entrada modificada})``.
+        """
+        try:
+            if not self._configurar_storage():
+                return {}, {}
+
+            # Las claves del manifiesto ya están en el bucket
+            self._claves_subidas.update(entry['key'] for entry in manifest.values() if entry.get('key'))
+
+            urls = set()
+            for data in parlamentarios_data:
+                for field in IMAGE_FIELDS:
+                    if data.get(field):
+                        urls.add(data[field])
+
+            print(f"🖼️ Sincronizando {len(urls)} imágenes...")
+            entries = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._fetch, url, manifest.get(url)): url for url in urls}
+                for future in as_completed(futures):
+                    entry = future.result()
+                    if entry:
+                        entries[futures[future]] = entry
+
+            # Solo se persisten las entradas que cambiaron (las 304 no cuestan nada)
+            cambios = {url: entry for url, entry in entries.items() if manifest.get(url) != entry}
+
+            result = {}
+            for data in parlamentarios_data:
+                keys = {}
+                for field, column in IMAGE_FIELDS.items():
+                    entry = entries.get(data.get(field))
+                    # Sin entrada (falló y no hay caché) queda None y no pisa la clave guardada
+                    keys[column] = entry['key'] if entry else None
+                if any(keys.values()):
+                    result[data['UUID']] = keys
+
+            print(f"✅ {len(entries)} de {len(urls)} imágenes disponibles en Storage ({len(cambios)} nuevas o modificadas)")
+            return result, cambios
+        except Exception as e:
+            print(f"❌ Error sincronizando imágenes: {e}")
+            return {}, {}
@@ -1,8 +1,10 @@
 from models.database import Database
+from utils.helpers import normalizar_uuid
 from datetime import datetime
 import json
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from typing import List, Dict, Any
 import uuid
 import time
@@ -11,16 +13,6 @@ class SupabaseService:
     def __init__(self):
         self.db = Database()
     
-    def check_parlamentario_exists(self, uuid: str) -> bool:
-        """Verifica si un parlamentario ya existe en la BD"""
-        try:
-            query = "SELECT id FROM parlamentarios WHERE uuid = %s"
-            result = self.db.execute_query(query, (uuid,))
-            return len(result) > 0
-        except Exception as e:
-            print(f"Error verificando parlamentario {uuid}: {e}")
-            return False
-    
     def get_or_create_comite(self, comite_data: Dict[str, Any]) -> int:
         """Obtiene o crea un comité y devuelve su ID"""
         try:
@@ -430,8 +422,243 @@ class SupabaseService:
         """Obtiene todos los UUID existentes en la BD para verificación rápida"""
         try:
             query = "SELECT uuid FROM parlamentarios"
-            result = self.db.execute_query(query)
-            return {item['uuid'] for item in result} if result else set()
+            # Forma canónica (minúsculas); las filas con UUID nulo o inválido se omiten
+            uuids = (normalizar_uuid(row[0]) for row in self.db.iter_query(query, as_tuples=True))
+            return {value for value in uuids if value}
         except Exception as e:
             print(f"Error obteniendo UUIDs existentes: {e}")
-            return set()
\ No newline at end of file
+            return set()
+
+    def _asegurar_esquema_imagenes(self, cursor):
+        """Crea columnas y tabla de imágenes solo si faltan (consultando el catálogo primero)"""
+        # ALTER TABLE toma un lock exclusivo aunque use IF NOT EXISTS, por eso se revisa antes
+        cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'parlamentarios' AND column_name = 'imagen_600_local'
+        """)
+        if not cursor.fetchone():
+            cursor.execute("""
+            ALTER TABLE parlamentarios
+                ADD COLUMN IF NOT EXISTS imagen_local TEXT,
+                ADD COLUMN IF NOT EXISTS imagen_120_local TEXT,
+                ADD COLUMN IF NOT EXISTS imagen_450_local TEXT,
+                ADD COLUMN IF NOT EXISTS imagen_600_local TEXT
+            """)
+
+        cursor.execute("SELECT to_regclass('imagenes_cache')")
+        if cursor.fetchone()[0] is None:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS imagenes_cache (
+                url TEXT PRIMARY KEY,
+                clave TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at TIMESTAMPTZ DEFAULT NOW()
+            )
+            """)
+
+    def get_imagenes_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene el manifiesto URL -> {key, etag, last_modified} de ejecuciones anteriores"""
+        conn = self.db.get_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            self._asegurar_esquema_imagenes(cursor)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Error preparando esquema de imágenes: {e}")
+            return {}
+        finally:
+            if cursor:
+                cursor.close()
+
+        try:
+            query = "SELECT url, clave, etag, last_modified FROM imagenes_cache"
+            return {
+                url: {'key': clave, 'etag': etag, 'last_modified': last_modified}
+                for url, clave, etag, last_modified in self.db.iter_query(query, as_tuples=True)
+            }
+        except Exception as e:
+            print(f"Error obteniendo caché de imágenes: {e}")
+            return {}
+
+    def guardar_imagenes_cache(self, entradas: Dict[str, Dict[str, Any]]) -> bool:
+        """Guarda las entradas nuevas o modificadas del manifiesto de imágenes"""
+        if not entradas:
+            return True
+        conn = self.db.get_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            execute_values(cursor, """
+            INSERT INTO imagenes_cache (url, clave, etag, last_modified)
+            VALUES %s
+            ON CONFLICT (url) DO UPDATE SET
+                clave = EXCLUDED.clave,
+                etag = EXCLUDED.etag,
+                last_modified = EXCLUDED.last_modified,
+                updated_at = NOW()
+            """, [
+                (url, entrada['key'], entrada.get('etag'), entrada.get('last_modified'))
+                for url, entrada in entradas.items()
+            ])
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Error guardando caché de imágenes: {e}")
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+
+    def update_imagenes_locales(self, imagenes: Dict[str, Dict[str, str]]) -> int:
+        """Registra las claves de Storage de las imágenes junto a sus URLs en un solo UPDATE"""
+        if not imagenes:
+            return 0
+        conn = self.db.get_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            filas = [
+                (uuid_value, keys.get('imagen_local'), keys.get('imagen_120_local'),
+                 keys.get('imagen_450_local'), keys.get('imagen_600_local'))
+                for uuid_value, keys in imagenes.items()
+            ]
+            # Una variante sin clave (descarga fallida) conserva la guardada.
+            # Una sola página para que rowcount sea el total
+            execute_values(cursor, """
+            UPDATE parlamentarios AS p SET
+                imagen_local = COALESCE(v.imagen_local, p.imagen_local),
+                imagen_120_local = COALESCE(v.imagen_120_local, p.imagen_120_local),
+                imagen_450_local = COALESCE(v.imagen_450_local, p.imagen_450_local),
+                imagen_600_local = COALESCE(v.imagen_600_local, p.imagen_600_local),
+                updated_at = NOW()
+            FROM (VALUES %s) AS v (uuid, imagen_local, imagen_120_local, imagen_450_local, imagen_600_local)
+            WHERE p.uuid = v.uuid::uuid
+              AND (p.imagen_local, p.imagen_120_local, p.imagen_450_local, p.imagen_600_local)
+                  IS DISTINCT FROM (COALESCE(v.imagen_local, p.imagen_local), COALESCE(v.imagen_120_local, p.imagen_120_local),
+                                    COALESCE(v.imagen_450_local, p.imagen_450_local), COALESCE(v.imagen_600_local, p.imagen_600_local))
+            """, filas, page_size=len(filas))
+            updated = cursor.rowcount
+            conn.commit()
+            return updated
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Error registrando imágenes locales: {e}")
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+
+    def _tipo_array(self, cursor, tabla: str, columna: str) -> sql.SQL:
+        """Devuelve el tipo array de una columna según el catálogo (p. ej. ``integer[]``)"""
+        cursor.execute("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = %s
+        """, (tabla, columna))
+        return sql.SQL(cursor.fetchone()[0] + '[]')
+
+    def reconciliar_membresias(self, parlamentarios_data: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Elimina vínculos de comité y cierra períodos que ya no vienen en el payload
+
+        Calcula el conjunto deseado para todo el payload y aplica una sola
+        sentencia anti-join por tabla dentro de una transacción propia. Solo se
+        tocan los parlamentarios presentes en el payload: los que faltan (por
+        una descarga parcial o un registro fallido) conservan sus datos.
+        """
+        resultado = {'comites_eliminados': 0, 'periodos_cerrados': 0}
+        if not parlamentarios_data:
+            print("⚠️ Payload vacío, se omite la reconciliación de membresías")
+            return resultado
+
+        payload_uuids = set()
+        comite_uuids, comite_ids = [], []
+        periodo_uuids, periodo_ids, periodo_camaras = [], [], []
+
+        for parlamentario in parlamentarios_data:
+            data = parlamentario.get('data', parlamentario)
+            uuid_value = normalizar_uuid(data.get('UUID'))
+            if not uuid_value:
+                continue
+            payload_uuids.add(uuid_value)
+
+            comites = data.get('COMITE', [])
+            if isinstance(comites, dict):
+                comites = [comites]
+            elif not isinstance(comites, list):
+                comites = []
+            for comite in comites:
+                if isinstance(comite, dict) and comite.get('ID'):
+                    comite_uuids.append(uuid_value)
+                    comite_ids.append(str(comite['ID']))
+
+            periodos = data.get('PERIODOS', [])
+            if isinstance(periodos, dict):
+                periodos = [periodos]
+            elif not isinstance(periodos, list):
+                periodos = []
+            for periodo in periodos:
+                if isinstance(periodo, dict) and periodo.get('ID'):
+                    periodo_uuids.append(uuid_value)
+                    periodo_ids.append(str(periodo['ID']))
+                    periodo_camaras.append(periodo.get('CAMARA', 'S'))
+
+        conn = self.db.get_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+
+            # Solo se reconcilian los parlamentarios del payload; se compara en el tipo nativo
+            if comite_ids:
+                cursor.execute(sql.SQL("""
+                DELETE FROM parlamentario_comite pc
+                USING parlamentarios p, comites c
+                WHERE pc.parlamentario_id = p.id
+                  AND pc.comite_id = c.id
+                  AND p.uuid = ANY(%(payload_uuids)s::uuid[])
+                  AND NOT EXISTS (
+                      SELECT 1 FROM unnest(%(uuids)s::uuid[], %(ids)s::{tipo_comite}) AS d (uuid, id_comite)
+                      WHERE d.uuid = p.uuid AND d.id_comite = c.id_comite
+                  )
+                """).format(
+                    tipo_comite=self._tipo_array(cursor, 'comites', 'id_comite')
+                ), {'payload_uuids': list(payload_uuids), 'uuids': comite_uuids, 'ids': comite_ids})
+                resultado['comites_eliminados'] = cursor.rowcount
+            else:
+                print("⚠️ El payload no trae comités, se omite la poda de parlamentario_comite")
+
+            # Los períodos son históricos: se cierran en vez de borrarse
+            if periodo_ids:
+                cursor.execute(sql.SQL("""
+                UPDATE periodos pe SET vigente = FALSE
+                FROM parlamentarios p
+                WHERE pe.parlamentario_id = p.id
+                  AND pe.vigente
+                  AND p.uuid = ANY(%(payload_uuids)s::uuid[])
+                  AND NOT EXISTS (
+                      SELECT 1 FROM unnest(%(uuids)s::uuid[], %(ids)s::{tipo_periodo}, %(periodo_camaras)s::{tipo_periodo_camara})
+                          AS d (uuid, id_periodo, camara)
+                      WHERE d.uuid = p.uuid
+                        AND d.id_periodo = pe.id_periodo
+                        AND d.camara = pe.camara
+                  )
+                """).format(
+                    tipo_periodo=self._tipo_array(cursor, 'periodos', 'id_periodo'),
+                    tipo_periodo_camara=self._tipo_array(cursor, 'periodos', 'camara')
+                ), {'payload_uuids': list(payload_uuids), 'uuids': periodo_uuids,
+                    'ids': periodo_ids, 'periodo_camaras': periodo_camaras})
+                resultado['periodos_cerrados'] = cursor.rowcount
+            else:
+                print("⚠️ El payload no trae períodos, se omite el cierre de períodos")
+
+            conn.commit()
+            return resultado
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Error reconciliando membresías: {e}")
+            return {'comites_eliminados': 0, 'periodos_cerrados': 0}
+        finally:
+            if cursor:
+                cursor.close()
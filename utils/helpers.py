@@ -1,10 +1,18 @@
 import requests
 import os
 import json
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def normalizar_uuid(value):
+    """Devuelve el UUID en forma canónica (minúsculas) o None si no es válido"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (ValueError, TypeError):
+        return None
+
 class APIHelper:
     def __init__(self):
         self.api_url = os.getenv('API_URL', 'https://www.senado.cl/_next/data/2nIj_T31TxUMBaXNPeOA5/senadoras-y-senadores/listado-de-senadoras-y-senadores.json')
@@ -59,6 +67,10 @@ class APIHelper:
                 'APELLIDO_PATERNO': raw_data.get('APELLIDO_PATERNO', ''),
                 'APELLIDO_MATERNO': raw_data.get('APELLIDO_MATERNO', ''),
                 'NOMBRE_COMPLETO': raw_data.get('NOMBRE_COMPLETO', ''),
+                'IMAGEN': raw_data.get('IMAGEN'),
+                'IMAGEN_120': raw_data.get('IMAGEN_120'),
+                'IMAGEN_450': raw_data.get('IMAGEN_450'),
+                'IMAGEN_600': raw_data.get('IMAGEN_600'),
                 'PERIODOS': raw_data.get('PERIODOS', []),
                 'COMITE': raw_data.get('COMITE', [])
             }